@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Raspberry Pi WoL hub server (Flask).
+Raspberry Pi WoL hub server (asyncio, standard library only).
 
 Tailscale setup (one-time):
   tailscale serve --https=443 http://127.0.0.1:5050
@@ -16,15 +16,32 @@ Usage:
 """
 
 import argparse
+import asyncio
+import contextlib
+import ctypes
+import functools
+import hashlib
 import json
 import logging
 import os
+import signal
 import socket
+import string
 import struct
+import sys
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
+from http import HTTPStatus
 from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+from urllib.parse import unquote
 
-from flask import Flask, jsonify, request
+try:
+    import orjson  # Optional: several times faster than json on Pi-class CPUs
+except ImportError:
+    orjson = None
 
 # ---------------------------------------------------------------------------
 # Config
@@ -32,38 +49,230 @@ from flask import Flask, jsonify, request
 
 HOST = "0.0.0.0"
 TAILSCALE_PORT = 5050
+REQUEST_TIMEOUT = 10.0  # Seconds a client gets to send its whole request
+MAX_HEADERS = 100
+MAX_BODY = 16 * 1024  # Bytes; WoL requests are tiny JSON objects
 
 WOL_TARGETS_PATH = Path(__file__).parent / "wol_targets.json"
 PC_BROADCAST = "255.255.255.255"  # Or your subnet broadcast, e.g. 192.168.1.255
 WOL_PORT = 9
+WOL_BURST = 3  # Default magic packets sent per wake request
+WOL_INTERVAL = 0.1  # Default seconds between packets in a burst
+WOL_COALESCE = 2.0  # Default seconds during which repeat wakes of a machine aren't resent
+# str.translate tables: drop MAC separators (incl. Cisco dotted); drop hex digits
+MAC_SEP_DELETE = str.maketrans("", "", ":-. ")
+HEX_DIGITS_DELETE = str.maketrans("", "", string.hexdigits)
+
+LAST_WAKE_PATH = Path(__file__).parent / "wol_last_wake.json"
+LAST_WAKE_MAX = 256  # Wake records kept; least recently woken are dropped first
+PERSIST_INTERVAL = 5.0  # Max seconds a recorded wake waits before hitting disk
 
 # Module-level state (loaded at startup)
-wol_targets: dict = {}
-wol_last_wake: dict = {}  # {target_name: UTC ISO timestamp}
+wol_targets: Mapping = MappingProxyType({})  # read-only once installed
+wol_available: str = "(none)"  # target names for "unknown target" errors
+wol_targets_mtime: Optional[int] = None  # st_mtime_ns of the targets file last loaded
+wol_last_wake: OrderedDict = OrderedDict()  # {target_name: UTC ISO timestamp}, oldest first
+last_wake_responses: dict = {}  # {target_name: (etag, body)}, dropped when the wake changes
+last_wake_path: Optional[Path] = None  # None disables persistence
+last_wake_save_task: Optional[asyncio.Task] = None  # pending debounced save
+wol_sock: Optional[socket.socket] = None  # shared non-blocking broadcast socket
+wol_burst: int = WOL_BURST
+wol_interval: float = WOL_INTERVAL
+wol_coalesce: float = WOL_COALESCE
+wol_last_sent: dict = {}  # {packet: monotonic send time}, oldest first
+wol_burst_tasks: set = set()  # in-flight background bursts (keeps tasks referenced)
+worker_pids: list = []  # forked worker processes (parent only)
 
 # Set log level via LOG_LEVEL env var (e.g. LOG_LEVEL=DEBUG)
 log_level = os.environ.get("LOG_LEVEL", "WARNING").upper()
 logging.basicConfig(level=getattr(logging, log_level, logging.WARNING))
 log = logging.getLogger("netmaster")
 
+if orjson is not None:
+    dumps_json = orjson.dumps
+    loads_json = orjson.loads
+else:
+
+    def dumps_json(obj) -> bytes:
+        # Compact separators, matching orjson's output
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    loads_json = json.loads
+
 # ---------------------------------------------------------------------------
 # Wake-on-LAN
 # ---------------------------------------------------------------------------
 
 
-def send_wol(mac: str) -> tuple[bool, str]:
-    """Send a Wake-on-LAN magic packet."""
+def build_magic_packet(mac: str) -> Optional[bytes]:
+    """Build the 102-byte magic packet for a MAC. Returns None if invalid."""
+    hex_str = mac.translate(MAC_SEP_DELETE)
+    # Valid iff 12 chars and nothing is left once hex digits are removed,
+    # so bytes.fromhex below can't raise
+    if len(hex_str) != 12 or hex_str.translate(HEX_DIGITS_DELETE):
+        return None
+    return b"\xff" * 6 + bytes.fromhex(hex_str) * 16
+
+
+async def send_wol(mac: str, packet: Optional[bytes] = None) -> tuple[bool, str, bool]:
+    """Send a Wake-on-LAN magic packet, building it from `mac` if not given.
+
+    Returns (ok, message, coalesced); coalesced means nothing was sent because
+    the same packet went out within wol_coalesce seconds.
+    """
     try:
-        mac_bytes = bytes.fromhex(mac.replace(":", "").replace("-", ""))
-        if len(mac_bytes) != 6:
-            return False, "invalid MAC address"
-        packet = b"\xff" * 6 + mac_bytes * 16
-        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-            sock.sendto(packet, (PC_BROADCAST, WOL_PORT))
-        return True, f"WoL packet sent to {mac}"
+        if packet is None:
+            packet = build_magic_packet(mac)
+            if packet is None:
+                return False, "invalid MAC address", False
+        if wol_recently_sent(packet):
+            return True, f"WoL packet sent to {mac} (coalesced)", True
+        if wol_burst > 1 and wol_interval == 0:
+            # Nothing to space out, so the whole burst can go in one syscall
+            sent = send_wol_batch(packet, wol_burst)
+            for _ in range(wol_burst - sent):
+                wol_sock.sendto(packet, (PC_BROADCAST, WOL_PORT))
+            mark_wol_sent(packet)
+            return True, f"WoL packet sent to {mac}", False
+        # Straight to the socket (not a DatagramTransport) so a failed send
+        # raises here; a full send buffer (BlockingIOError) counts as failure
+        wol_sock.sendto(packet, (PC_BROADCAST, WOL_PORT))
+        # No await since the wol_recently_sent check, so concurrent wakes can't both send
+        mark_wol_sent(packet)
+        if wol_burst > 1:
+            # UDP is lossy: repeat the packet in the background so the
+            # response doesn't wait on the burst
+            task = asyncio.create_task(send_wol_burst_rest(packet))
+            wol_burst_tasks.add(task)
+            task.add_done_callback(wol_burst_tasks.discard)
+        return True, f"WoL packet sent to {mac}", False
     except Exception as e:
-        return False, str(e)
+        return False, str(e), False
+
+
+def wol_recently_sent(packet: bytes) -> bool:
+    """True if `packet` went out within the last wol_coalesce seconds.
+
+    Keyed on the packet, so the same machine is matched whether it was woken
+    by target name or by MAC in any notation.
+    """
+    now = time.monotonic()
+    # Entries are only added, never refreshed, so expired ones sit at the front
+    while wol_last_sent:
+        oldest = next(iter(wol_last_sent))
+        if now - wol_last_sent[oldest] < wol_coalesce:
+            break
+        del wol_last_sent[oldest]
+    return packet in wol_last_sent
+
+
+def mark_wol_sent(packet: bytes) -> None:
+    """Start the coalescing window for `packet`; call once it has actually gone out."""
+    wol_last_sent[packet] = time.monotonic()
+
+
+# ---------------------------------------------------------------------------
+# sendmmsg(2) (Linux only; Python has no binding, so go through ctypes)
+# ---------------------------------------------------------------------------
+
+
+class IOVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(IOVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+def load_sendmmsg():
+    """Return libc's sendmmsg, or None where it isn't available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        fn = ctypes.CDLL(None, use_errno=True).sendmmsg
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.POINTER(MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+libc_sendmmsg = load_sendmmsg()
+
+
+@functools.lru_cache(maxsize=64)
+def build_mmsg_batch(packet: bytes, count: int) -> tuple:
+    """Build an mmsghdr array of `count` copies of `packet` to the broadcast address.
+
+    Returns (array, buffers); the buffers must stay referenced while the array is used.
+    """
+    payload = ctypes.create_string_buffer(packet, len(packet))
+    sockaddr = struct.pack("=H", socket.AF_INET) + struct.pack("!H", WOL_PORT)
+    sockaddr += socket.inet_aton(PC_BROADCAST) + bytes(8)  # struct sockaddr_in
+    addr = ctypes.create_string_buffer(sockaddr, len(sockaddr))
+    iov = IOVec(ctypes.cast(payload, ctypes.c_void_p), len(packet))
+    msgs = (MMsgHdr * count)()
+    for msg in msgs:
+        msg.msg_hdr.msg_name = ctypes.cast(addr, ctypes.c_void_p)
+        msg.msg_hdr.msg_namelen = len(sockaddr)
+        msg.msg_hdr.msg_iov = ctypes.pointer(iov)
+        msg.msg_hdr.msg_iovlen = 1
+    return msgs, (payload, addr, iov)
+
+
+def send_wol_batch(packet: bytes, count: int) -> int:
+    """Send `count` copies of `packet` with a single sendmmsg(2). Returns how many went out.
+
+    Returns 0 when sendmmsg is unavailable or fails (e.g. ENOSYS), leaving the
+    caller to fall back to sendto.
+    """
+    if libc_sendmmsg is None:
+        return 0
+    msgs, _buffers = build_mmsg_batch(packet, count)
+    fd = wol_sock.fileno()
+    sent = libc_sendmmsg(fd, msgs, count, 0)
+    if sent < 0:
+        log.debug("sendmmsg failed: %s", os.strerror(ctypes.get_errno()))
+        return 0
+    return sent
+
+
+async def send_wol_burst_rest(packet: bytes) -> None:
+    """Send the remaining wol_burst - 1 packets, wol_interval seconds apart."""
+    for _ in range(wol_burst - 1):
+        await asyncio.sleep(wol_interval)
+        if wol_sock is None:
+            return
+        try:
+            wol_sock.sendto(packet, (PC_BROADCAST, WOL_PORT))
+        except OSError as e:
+            log.warning("WoL burst packet failed: %s", e)
+
+
+@contextlib.asynccontextmanager
+async def open_wol_socket():
+    """Open one broadcast UDP socket for the server's lifetime and reuse it for every send."""
+    global wol_sock
+    wol_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    wol_sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    wol_sock.setblocking(False)
+    try:
+        yield
+    finally:
+        wol_sock.close()
+        wol_sock = None
 
 
 # ---------------------------------------------------------------------------
@@ -71,71 +280,432 @@ def send_wol(mac: str) -> tuple[bool, str]:
 # ---------------------------------------------------------------------------
 
 
-def load_wol_targets(path: Path) -> dict:
-    """Load WoL target map from JSON file. Returns empty dict on failure."""
+def load_wol_targets(path: Path) -> Optional[dict]:
+    """Load WoL target map from JSON file. Returns None if the file can't be used.
+
+    Each target's magic packet is built once here and stored under "packet".
+    Targets with a missing or invalid MAC are skipped.
+    """
     try:
         with open(path) as f:
             data = json.load(f)
-        log.debug("Loaded %d WoL target(s) from %s", len(data), path)
-        return data
+        if not isinstance(data, dict):
+            log.warning("WoL targets file %s must hold a JSON object", path)
+            return None
+        targets = {}
+        for name, entry in data.items():
+            mac = entry.get("mac") if isinstance(entry, dict) else None
+            if not isinstance(mac, str):
+                log.warning("Skipping WoL target '%s': missing or non-string 'mac'", name)
+                continue
+            packet = build_magic_packet(mac)
+            if packet is None:
+                log.warning("Skipping WoL target '%s': invalid MAC address", name)
+                continue
+            entry["packet"] = packet
+            targets[name] = entry
+        log.debug("Loaded %d WoL target(s) from %s", len(targets), path)
+        return targets
     except FileNotFoundError:
         log.warning("WoL targets file not found: %s", path)
-        return {}
-    except json.JSONDecodeError as e:
+        return None
+    except OSError as e:
+        log.warning("Cannot read WoL targets file %s: %s", path, e)
+        return None
+    except ValueError as e:  # JSONDecodeError, or bytes that aren't UTF-8
         log.warning("Invalid JSON in %s: %s", path, e)
-        return {}
+        return None
+
+
+def install_wol_targets(targets: dict) -> None:
+    """Publish a loaded target map read-only, along with its names string."""
+    global wol_targets, wol_available
+    wol_targets = MappingProxyType(targets)
+    wol_available = ", ".join(targets) or "(none)"
+
+
+def reload_wol_targets(path: Path) -> None:
+    """(Re)load the targets file, skipping the parse if it is unchanged since last load.
+
+    If the file can't be read or parsed, the installed targets stay in place.
+    """
+    global wol_targets_mtime
+    try:
+        mtime = path.stat().st_mtime_ns
+    except OSError as e:
+        log.warning("Cannot read WoL targets file %s: %s", path, e)
+        return
+    if mtime == wol_targets_mtime:
+        log.debug("WoL targets file unchanged, not reloading")
+        return
+    targets = load_wol_targets(path)
+    if targets is None:
+        log.warning("Keeping current WoL targets: %s", wol_available)
+        return
+    install_wol_targets(targets)
+    wol_targets_mtime = mtime
+    log.info("WoL targets: %s", wol_available)
+
+
+# ---------------------------------------------------------------------------
+# Wake history
+# ---------------------------------------------------------------------------
+
+
+def load_last_wake(path: Path) -> OrderedDict:
+    """Load persisted wake history. Returns an empty history on failure."""
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return OrderedDict()
+    except (OSError, json.JSONDecodeError) as e:
+        log.warning("Could not read wake history %s: %s", path, e)
+        return OrderedDict()
+    if not isinstance(data, dict):
+        log.warning("Ignoring malformed wake history in %s", path)
+        return OrderedDict()
+    entries = [(k, v) for k, v in data.items() if isinstance(k, str) and isinstance(v, str)]
+    if len(entries) < len(data):
+        log.warning("Dropped %d malformed wake record(s) from %s", len(data) - len(entries), path)
+    history = OrderedDict(sorted(entries, key=lambda item: item[1]))
+    while len(history) > LAST_WAKE_MAX:
+        history.popitem(last=False)
+    log.debug("Loaded %d wake record(s) from %s", len(history), path)
+    return history
+
+
+def save_last_wake(path: Path) -> None:
+    """Atomically write the wake history to `path`."""
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        with open(tmp, "w") as f:
+            json.dump(wol_last_wake, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        log.error("Could not save wake history to %s: %s", path, e)
+
+
+async def save_last_wake_later() -> None:
+    global last_wake_save_task
+    await asyncio.sleep(PERSIST_INTERVAL)
+    last_wake_save_task = None
+    save_last_wake(last_wake_path)
+
+
+def record_wake(name: str, ts: str) -> None:
+    """Record a wake, evicting the oldest entry past LAST_WAKE_MAX, and schedule a save."""
+    global last_wake_save_task
+    wol_last_wake[name] = ts
+    wol_last_wake.move_to_end(name)
+    last_wake_responses.pop(name, None)
+    if len(wol_last_wake) > LAST_WAKE_MAX:
+        evicted, _ = wol_last_wake.popitem(last=False)
+        last_wake_responses.pop(evicted, None)
+    # Writes within PERSIST_INTERVAL of each other share one save
+    if last_wake_path is not None and last_wake_save_task is None:
+        last_wake_save_task = asyncio.create_task(save_last_wake_later())
+
+
+@contextlib.asynccontextmanager
+async def persist_last_wake():
+    """Flush any pending wake-history save on shutdown."""
+    global last_wake_save_task
+    try:
+        yield
+    finally:
+        if last_wake_save_task is not None:
+            last_wake_save_task.cancel()
+            last_wake_save_task = None
+            save_last_wake(last_wake_path)
+
+
+# ---------------------------------------------------------------------------
+# HTTP responses
+# ---------------------------------------------------------------------------
+
+
+class HTTPError(Exception):
+    """Raised while reading a request; carries the response to send instead."""
+
+    def __init__(self, response: bytes):
+        super().__init__(response)
+        self.response = response
+
+
+def build_response(status: int, body: Optional[bytes] = None, headers: tuple = ()) -> bytes:
+    """Serialize a complete HTTP response, so it goes out in a single write."""
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}", *headers, "Connection: close"]
+    if body is not None:
+        lines += ["Content-Type: application/json", f"Content-Length: {len(body)}"]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+
+def error_body(message: str) -> bytes:
+    return dumps_json({"ok": False, "error": message})
+
+
+@functools.lru_cache(maxsize=256)
+def encode_json_response(status: int, items: tuple) -> bytes:
+    # Responses repeat (same target, same message), so memoize their encoding.
+    # Bounded, since request-supplied names and MACs end up in bodies too.
+    return build_response(status, dumps_json(dict(items)))
+
+
+def json_response(status: int = 200, **body) -> bytes:
+    """Full JSON response for a body of hashable values, via encode_json_response."""
+    return encode_json_response(status, tuple(body.items()))
+
+
+# Fixed responses, serialized once
+HEALTH_RESPONSE = build_response(200, dumps_json({"ok": True}), ("Cache-Control: no-store",))
+MISSING_MAC_RESPONSE = build_response(400, error_body("request must include 'target' or 'mac'"))
+BAD_REQUEST_RESPONSE = build_response(400, error_body("malformed request"))
+NOT_FOUND_RESPONSE = build_response(404, error_body("not found"))
+METHOD_NOT_ALLOWED_BODY = error_body("method not allowed")
+LENGTH_REQUIRED_RESPONSE = build_response(411, error_body("Content-Length required"))
+PAYLOAD_TOO_LARGE_RESPONSE = build_response(413, error_body("request body too large"))
+INTERNAL_ERROR_RESPONSE = build_response(500, error_body("internal server error"))
 
 
 # ---------------------------------------------------------------------------
 # Tailscale app (WoL — localhost only, behind tailscale serve)
 # ---------------------------------------------------------------------------
 
-app = Flask("netmaster")
 
+async def wol_health_handler(headers: dict, data: bytes) -> bytes:
+    # GET is used by tailscale serve health checks; the reply never varies
+    return HEALTH_RESPONSE
 
-@app.route("/wol", methods=["GET", "POST"])
-def wol_handler():
-    # GET is used by tailscale serve health checks
-    if request.method == "GET":
-        return jsonify(ok=True), 200
 
-    body = request.get_json(silent=True) or {}
+async def wol_handler(headers: dict, data: bytes) -> bytes:
+    try:
+        body = (loads_json(data) if data else None) or {}
+    except ValueError:
+        body = {}
 
     # Resolve MAC address from target name or direct MAC
     if "target" in body:
         target_name = body["target"]
         target = wol_targets.get(target_name)
         if target is None:
-            available = ", ".join(wol_targets.keys()) if wol_targets else "(none)"
-            return jsonify(
+            return json_response(
+                400,
                 ok=False,
                 error=f"unknown target: '{target_name}'",
-                available=available,
-            ), 400
+                available=wol_available,
+            )
         mac = target["mac"]
+        packet = target["packet"]
     elif "mac" in body:
         mac = body["mac"]
+        packet = None
     else:
-        return jsonify(ok=False, error="request must include 'target' or 'mac'"), 400
+        return MISSING_MAC_RESPONSE
 
     log.debug("Sending WoL packet to %s", mac)
-    ok, message = send_wol(mac)
-    if ok and "target" in body:
-        wol_last_wake[target_name] = datetime.now(timezone.utc).isoformat()
+    ok, message, coalesced = await send_wol(mac, packet)
+    # A coalesced wake sent nothing, so the earlier wake stays the last one
+    if ok and not coalesced and "target" in body:
+        record_wake(target_name, datetime.now(timezone.utc).isoformat())
         log.debug("Recorded wake for '%s' at %s", target_name, wol_last_wake[target_name])
     if not ok:
         log.error("WoL failed for %s: %s", mac, message)
     status = 200 if ok else 500
-    return jsonify(ok=ok, message=message), status
-
-
-@app.route("/wol/last-wake/<name>")
-def wol_last_wake_handler(name):
+    return json_response(status, ok=ok, message=message)
+
+
+def last_wake_response(name: str, ts: str) -> tuple[str, bytes, bytes]:
+    """Return (etag, 200 response, 304 response) for a recorded wake, built on first use."""
+    cached = last_wake_responses.get(name)
+    if cached is None:
+        etag = '"%s"' % hashlib.blake2s(ts.encode(), digest_size=8).hexdigest()
+        cache_headers = (f"ETag: {etag}", "Cache-Control: no-cache")
+        body = dumps_json({"ok": True, "target": name, "last_wake": ts})
+        cached = last_wake_responses[name] = (
+            etag,
+            build_response(200, body, cache_headers),
+            build_response(304, None, cache_headers),
+        )
+    return cached
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check using weak comparison: W/ prefixes are ignored, * matches."""
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def wol_last_wake_handler(headers: dict, data: bytes, name: str) -> bytes:
     log.debug("Last-wake query for '%s'", name)
     ts = wol_last_wake.get(name)
     if ts is None:
         log.debug("No WoL record for '%s'", name)
-    return jsonify(ok=True, target=name, last_wake=ts), 200
+        return json_response(ok=True, target=name, last_wake=None)
+
+    # Pollers revalidate with If-None-Match; answer 304 until the next wake
+    etag, response, not_modified = last_wake_response(name, ts)
+    if etag_matches(headers.get("if-none-match"), etag):
+        return not_modified
+    return response
+
+
+# {path: {method: handler}}, matched after stripping the query and trailing slash
+ROUTES = {
+    "/wol": {"GET": wol_health_handler, "POST": wol_handler},
+}
+LAST_WAKE_PREFIX = "/wol/last-wake/"
+LAST_WAKE_ROUTE = {"GET": wol_last_wake_handler}
+
+
+def resolve(path: str) -> tuple[Optional[dict], tuple]:
+    """Map a normalized path to its {method: handler} table and path parameters."""
+    methods = ROUTES.get(path)
+    if methods is not None:
+        return methods, ()
+    if path.startswith(LAST_WAKE_PREFIX):
+        name = path[len(LAST_WAKE_PREFIX):]
+        if name and "/" not in name:
+            return LAST_WAKE_ROUTE, (unquote(name),)
+    return None, ()
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[tuple[str, str, dict, bytes]]:
+    """Read one request as (method, target, headers, body); None if the client sent nothing."""
+    try:
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        method, target, _version = request_line.decode("latin-1").split()
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, sep, value = line.decode("latin-1").partition(":")
+            if not sep or len(headers) >= MAX_HEADERS:
+                raise HTTPError(BAD_REQUEST_RESPONSE)
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0))
+    except ValueError:  # bad request line or Content-Length, or a line over the reader's limit
+        raise HTTPError(BAD_REQUEST_RESPONSE) from None
+
+    if "transfer-encoding" in headers:
+        raise HTTPError(LENGTH_REQUIRED_RESPONSE)
+    if length < 0:
+        raise HTTPError(BAD_REQUEST_RESPONSE)
+    if length > MAX_BODY:
+        raise HTTPError(PAYLOAD_TOO_LARGE_RESPONSE)
+    body = await reader.readexactly(length) if length else b""
+    return method, target, headers, body
+
+
+async def respond(reader: asyncio.StreamReader) -> Optional[bytes]:
+    """Read a request and produce the full response bytes for it."""
+    try:
+        request = await asyncio.wait_for(read_request(reader), REQUEST_TIMEOUT)
+    except HTTPError as e:
+        return e.response
+    if request is None:
+        return None
+    method, target, headers, data = request
+    if method == "HEAD":
+        # Answered like GET, headers only (Content-Length still gives the GET body size)
+        response = await dispatch("GET", target, headers, data)
+        return response[: response.index(b"\r\n\r\n") + 4]
+    return await dispatch(method, target, headers, data)
+
+
+async def dispatch(method: str, target: str, headers: dict, data: bytes) -> bytes:
+    """Route a request to its handler and return the full response bytes."""
+    path = target.split("?", 1)[0].rstrip("/")
+    methods, params = resolve(path)
+    if methods is None:
+        return NOT_FOUND_RESPONSE
+    handler = methods.get(method)
+    if handler is None:
+        allowed = [*methods, "HEAD"] if "GET" in methods else list(methods)
+        return build_response(405, METHOD_NOT_ALLOWED_BODY, (f"Allow: {', '.join(allowed)}",))
+    try:
+        return await handler(headers, data, *params)
+    except Exception:
+        log.exception("Error handling %s %s", method, path)
+        return INTERNAL_ERROR_RESPONSE
+
+
+async def handle_client(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Serve a single request per connection."""
+    try:
+        response = await respond(reader)
+        if response:
+            writer.write(response)
+            await writer.drain()
+    except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def handle_sighup(config: Path) -> None:
+    reload_wol_targets(config)
+    for pid in worker_pids:
+        os.kill(pid, signal.SIGHUP)
+
+
+async def serve(port: int, config: Path, reuse_port: bool = False) -> None:
+    """Run the HTTP server until SIGINT/SIGTERM, reloading targets on SIGHUP."""
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    loop.add_signal_handler(signal.SIGHUP, handle_sighup, config)
+
+    async with open_wol_socket(), persist_last_wake():
+        server = await asyncio.start_server(handle_client, HOST, port, reuse_port=reuse_port)
+        async with server:
+            await stop.wait()
+
+
+def run_workers(port: int, config: Path, workers: int) -> None:
+    """Fork workers - 1 extra processes, each binding the port with SO_REUSEPORT.
+
+    The kernel spreads incoming connections across them. The parent serves
+    too, and forwards SIGHUP to and reaps the workers.
+    """
+    reuse_port = workers > 1
+    for _ in range(workers - 1):
+        pid = os.fork()
+        if pid == 0:
+            worker_pids.clear()
+            status = 0
+            try:
+                asyncio.run(serve(port, config, reuse_port))
+            except BaseException:
+                log.exception("Worker %d failed", os.getpid())
+                status = 1
+            finally:
+                logging.shutdown()
+                os._exit(status)
+        worker_pids.append(pid)
+
+    try:
+        asyncio.run(serve(port, config, reuse_port))
+    finally:
+        for pid in worker_pids:
+            with contextlib.suppress(ProcessLookupError):
+                os.kill(pid, signal.SIGTERM)
+        for pid in worker_pids:
+            os.waitpid(pid, 0)
 
 
 # ---------------------------------------------------------------------------
@@ -157,21 +727,71 @@ def main():
         default=WOL_TARGETS_PATH,
         help=f"WoL targets JSON file (default {WOL_TARGETS_PATH})",
     )
+    parser.add_argument(
+        "--wol-burst",
+        type=int,
+        default=WOL_BURST,
+        help=f"Magic packets sent per wake request (default {WOL_BURST})",
+    )
+    parser.add_argument(
+        "--wol-interval",
+        type=float,
+        default=WOL_INTERVAL,
+        help=f"Seconds between packets in a burst (default {WOL_INTERVAL})",
+    )
+    parser.add_argument(
+        "--wol-coalesce",
+        type=float,
+        default=WOL_COALESCE,
+        help=f"Seconds during which repeat wakes of a machine aren't resent, "
+        f"0 to disable (default {WOL_COALESCE})",
+    )
+    parser.add_argument(
+        "--last-wake-file",
+        type=Path,
+        default=LAST_WAKE_PATH,
+        help=f"File wake history is persisted to (default {LAST_WAKE_PATH})",
+    )
+    parser.add_argument(
+        "--no-persist",
+        action="store_true",
+        help="Keep wake history in memory only",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Server processes sharing the port via SO_REUSEPORT; each keeps "
+        "its own wake history and coalescing state, so more than 1 requires "
+        "--no-persist (default 1)",
+    )
     args = parser.parse_args()
-
-    global wol_targets
-    wol_targets = load_wol_targets(args.config)
-
-    log.info("Listening on %s:%d", HOST, args.ts_port)
-    if wol_targets:
-        log.info("WoL targets: %s", ", ".join(wol_targets.keys()))
-    else:
-        log.info("WoL targets: (none loaded)")
-
-    try:
-        app.run(host=HOST, port=args.ts_port, use_reloader=False)
-    except KeyboardInterrupt:
-        log.info("Shutting down")
+    if args.wol_burst < 1:
+        parser.error("--wol-burst must be at least 1")
+    if args.wol_interval < 0:
+        parser.error("--wol-interval must not be negative")
+    if args.wol_coalesce < 0:
+        parser.error("--wol-coalesce must not be negative")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.workers > 1 and not (hasattr(os, "fork") and hasattr(socket, "SO_REUSEPORT")):
+        parser.error("--workers > 1 needs fork() and SO_REUSEPORT")
+    if args.workers > 1 and not args.no_persist:
+        # Each worker would save only its own wakes over the others' in the same file
+        parser.error("--workers > 1 requires --no-persist")
+
+    global wol_burst, wol_interval, wol_coalesce, wol_last_wake, last_wake_path
+    wol_burst = args.wol_burst
+    wol_interval = args.wol_interval
+    wol_coalesce = args.wol_coalesce
+    reload_wol_targets(args.config)
+    if not args.no_persist:
+        last_wake_path = args.last_wake_file
+        wol_last_wake = load_last_wake(last_wake_path)
+
+    log.info("Listening on %s:%d (%d worker(s))", HOST, args.ts_port, args.workers)
+    run_workers(args.ts_port, args.config, args.workers)
+    log.info("Shutting down")
 
 
 if __name__ == "__main__":